@@ -1,13 +1,13 @@
 import asyncio
 import base64
-import json
 import uuid
-import sys
 import re
-import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
+from urllib.parse import urlsplit
 from fastapi import WebSocket
 
 # Import for sync Playwright as workaround for Windows Python 3.13
@@ -18,56 +18,219 @@ except ImportError:
     PLAYWRIGHT_AVAILABLE = False
 
 from backend.models import TaskRequest, AgentState
-from backend.utils import get_llm_instance, setup_logging
+from backend.utils import canonical_url, dumps_json, get_llm_instance, normalize_url, parse_url_from_context, setup_logging
 
 logger = setup_logging()
 
+# Whole-task search phrasings, compiled once at import; order is match
+# precedence ("search for" wins over "search", then "look up/for")
+_SEARCH_CLICK_SUFFIX = r'(?:\s+(?:and|then)\s+click\s+(?:on\s+)?(?:the\s+)?([^,\.]+))?'
+_SEARCH_TASK_RES = tuple(re.compile(prefix + r'[\'"]([^"\']+)[\'"]' + _SEARCH_CLICK_SUFFIX) for prefix in (
+    r'search\s+for\s+',
+    r'search\s+',
+    r'look\s+(?:up|for)\s+',
+))
+
+# Step delimiters for multi-step tasks: ; , newline, or "then"-style joiners
+_STEP_SPLIT_RE = re.compile(r'[;,\n]|(?:\s+(?:then|and then|next|after that)\s+)', re.IGNORECASE)
+
+# Per-step instruction patterns, compiled once at import; order within each
+# tuple is match precedence
+_STEP_SEARCH_RE = re.compile(r'search\s+(?:for\s+)?[\'"]([^"\']+)[\'"]')
+_STEP_NAVIGATE_RE = re.compile(r'(?:go to|navigate to|visit|open)\s+([^\s,;]+)')
+_STEP_FILL_RES = (
+    re.compile(r'(?:enter|type|input)\s+[\'"]([^"\']+)["\']\s+(?:into|in)\s+(?:the\s+)?[\'"]?([^"\']+)[\'"]?\s*(?:field|input|box)?'),
+    re.compile(r'fill\s+[\'"]?([^"\']+)[\'"]?\s+(?:field\s+)?with\s+[\'"]([^"\']+)[\'"]'),
+    re.compile(r'(?:fill|enter)\s+([^"\']+)\s+(?:field|input)?\s*(?:with|as)\s+[\'"]([^"\']+)[\'"]'),
+)
+_STEP_CLICK_RES = (
+    re.compile(r'click\s+(?:on\s+)?(?:the\s+)?[\'"]?([^"\']+)[\'"]?(?:\s+(?:button|link|result))?'),
+    re.compile(r'(?:press|tap)\s+(?:the\s+)?[\'"]?([^"\']+)[\'"]?'),
+    re.compile(r'select\s+(?:the\s+)?[\'"]?([^"\']+)[\'"]?'),
+)
+_STEP_WAIT_RE = re.compile(r'wait\s+(\d+)\s*(?:seconds?|ms)?')
+_SUBMIT_KEYWORDS = ('submit', 'press enter', 'hit enter')
+# Instruction key shown as the step detail in simulation mode, in priority order
+_INSTRUCTION_DETAIL_KEYS = ("query", "field", "element", "url")
+
+# Candidate search boxes, combined into a single CSS union for one lookup
+_SEARCH_BOX_SELECTOR = ", ".join(f"{selector}:visible" for selector in (
+    'input[name="q"]',  # Google search box
+    'input[type="search"]',
+    'input[placeholder*="Search" i]',
+    'input[aria-label*="Search" i]',
+    'input[title*="Search" i]',
+    '#search',
+    '.search-input',
+    '[data-testid="search"]'
+))
+
+# Enhanced click strategies as (selector template, description), tried in
+# order; {text} is filled with the element text from the instruction
+_CLICK_STRATEGIES = (
+    # First result specific selectors
+    ('h3:first-of-type', 'first result heading'),
+    ('a[href]:has(h3):first-of-type', 'first result link with heading'),
+    ('.g:first-of-type a[href]', 'first Google result link'),
+    ('[data-testid="result"]:first-of-type a', 'first result by test id'),
+    
+    # Button and link selectors
+    ('button:has-text("{text}")', 'button with text'),
+    ('input[type="submit"][value*="{text}" i]', 'submit button'),
+    ('input[type="button"][value*="{text}" i]', 'input button'),
+    ('a:has-text("{text}")', 'link with text'),
+    ('[role="button"]:has-text("{text}")', 'role button'),
+    
+    # Generic selectors
+    ('*:text-is("{text}")', 'exact text match'),
+    ('*:text("{text}")', 'partial text match')
+)
+
+# Minimum spacing (s) between actions against the same host
+STEP_MIN_INTERVAL = 1.5
+
+# Minimum wait (s) between checks of a task's deadline while it is paused
+DEADLINE_CHECK_INTERVAL = 0.5
+
+# Max time (ms) for a navigation to reach DOMContentLoaded, and extra time
+# allowed afterwards for the load event before screenshotting
+NAVIGATION_TIMEOUT = 30000
+NAVIGATION_LOAD_TIMEOUT = 3000
+
+# Max time (ms) to wait for the page to settle after a click or search submit
+ACTION_SETTLE_TIMEOUT = 3000
+
+# JPEG quality for live screenshots streamed to the UI
+SCREENSHOT_QUALITY = 60
+
+# Max screenshot/step events from the browser thread waiting to be broadcast;
+# past this they are dropped. Status and error events are never dropped
+EVENT_QUEUE_SIZE = 256
+DROPPABLE_EVENT_TYPES = frozenset({"screenshot", "step"})
+
+# Upper bound on WebSocket clients and on how long one send may take
+WS_MAX_CONNECTIONS = 50
+WS_SEND_TIMEOUT = 5.0
+
+# Fillable elements and a JS snippet describing all of them in one
+# evaluate_all(); the elements come from the same locator later used to pick
+# one by index, so shadow-DOM fields line up in both lists
+_FORM_FIELD_SELECTOR = "input, textarea"
+_FORM_FIELDS_JS = """
+(elements) => elements.map((e, i) => ({
+    index: i,
+    tag: e.tagName.toLowerCase(),
+    name: e.name || '',
+    id: e.id || '',
+    placeholder: e.placeholder || '',
+    label: e.getAttribute('aria-label') || '',
+    visible: e.type !== 'hidden' && !!(e.offsetWidth || e.offsetHeight || e.getClientRects().length)
+}))
+"""
+
+def _timestamp() -> str:
+    """ISO-8601 local time for event payloads"""
+    return datetime.now().isoformat()
+
 class AgentManager:
     def __init__(self):
         self.state = AgentState()
-        self.ws_connections: List[WebSocket] = []
+        self.ws_connections: Set[WebSocket] = set()
         self.results: List[Dict[str, Any]] = []
+        # Latest screenshot event, already serialized, sent to clients as they
+        # connect. Log events aren't replayed: a reconnecting client has them
+        # on screen already and a replayed error would reopen its modal
+        self._last_screenshot: Optional[str] = None
         self.task_id: Optional[str] = None
         self.browser = None
         self.page = None
         self.playwright_instance = None
         self.is_paused_flag = False
+        # Cleared while paused; the running task blocks on it instead of polling
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        # Time spent paused doesn't count towards the task timeout
+        self._paused_at: Optional[float] = None
+        self._paused_total = 0.0
+        self._agent_task: Optional[asyncio.Task] = None
+        # Per-task cancel token, set on stop/timeout; the browser thread
+        # checks it between steps
+        self._cancel_event = threading.Event()
+        # Earliest time.monotonic() at which each host may be acted on again
+        self._host_next_ok: Dict[str, float] = {}
+        # Digest of the last screenshot sent, used to drop unchanged frames
+        self._last_screenshot_digest: Optional[int] = None
+        # Browser-thread events are handed to the event loop through this
+        # queue and broadcast by a single long-lived drain task
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._events: Optional[asyncio.Queue] = None
+        # Droppable events currently waiting in _events
+        self._pending_droppable = 0
+        self._drain_task: Optional[asyncio.Task] = None
+        # Sync Playwright objects are bound to the thread that created them, so
+        # the browser lives on one dedicated worker thread for the app lifetime
+        self._browser_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="playwright")
 
-    async def connect(self, websocket: WebSocket):
-        """Connect a new WebSocket client"""
+    async def connect(self, websocket: WebSocket) -> bool:
+        """Connect a new WebSocket client, returning False if it was rejected"""
         await websocket.accept()
-        self.ws_connections.append(websocket)
+        if len(self.ws_connections) >= WS_MAX_CONNECTIONS:
+            # 1013 = "try again later"; keeps broadcast fan-out bounded
+            await websocket.close(code=1013)
+            logger.warning("WebSocket rejected: connection limit (%s) reached", WS_MAX_CONNECTIONS)
+            return False
+        self.ws_connections.add(websocket)
         await self._broadcast({
             "type": "connected", 
             "status": self.state.status,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _timestamp()
         })
-        logger.info(f"WebSocket connected. Total connections: {len(self.ws_connections)}")
+        await self._replay_screenshot(websocket)
+        logger.info("WebSocket connected. Total connections: %s", len(self.ws_connections))
+        return True
+
+    async def _replay_screenshot(self, websocket: WebSocket):
+        """Send the current run's latest screenshot to a newly connected client"""
+        if self._last_screenshot is None:
+            return
+        try:
+            await asyncio.wait_for(websocket.send_text(self._last_screenshot), WS_SEND_TIMEOUT)
+        except Exception as e:
+            logger.warning("Failed to replay screenshot to WebSocket: %r", e)
+            self.disconnect(websocket)
 
     def disconnect(self, websocket: WebSocket):
         """Disconnect a WebSocket client"""
         if websocket in self.ws_connections:
-            self.ws_connections.remove(websocket)
-            logger.info(f"WebSocket disconnected. Total connections: {len(self.ws_connections)}")
+            self.ws_connections.discard(websocket)
+            logger.info("WebSocket disconnected. Total connections: %s", len(self.ws_connections))
 
-    async def _broadcast(self, data: Dict[str, Any]):
-        """Broadcast message to all connected WebSocket clients"""
+    async def _broadcast(self, data: Dict[str, Any], message: Optional[str] = None):
+        """Broadcast message to all connected WebSocket clients
+        
+        `message` is `data` already serialized, when the caller has it.
+        """
+        if message is None:
+            message = dumps_json(data)
+        if data["type"] == "screenshot":
+            self._last_screenshot = message
         if not self.ws_connections:
             return
         
-        message = json.dumps(data, default=str)
-        disconnected = []
-        
-        for ws in self.ws_connections:
-            try:
-                await ws.send_text(message)
-            except Exception as e:
-                logger.warning(f"Failed to send to WebSocket: {e}")
-                disconnected.append(ws)
+        # Send to every client concurrently so one slow socket doesn't hold
+        # up the rest; snapshot first since clients may connect meanwhile.
+        # A client that can't take a frame within the timeout is dropped
+        clients = tuple(self.ws_connections)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(ws.send_text(message), WS_SEND_TIMEOUT) for ws in clients),
+            return_exceptions=True
+        )
         
         # Remove disconnected clients
-        for ws in disconnected:
-            self.disconnect(ws)
+        for ws, result in zip(clients, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to send to WebSocket: %r", result)
+                self.disconnect(ws)
 
     def is_running(self) -> bool:
         return self.state.status == "running"
@@ -75,6 +238,39 @@ class AgentManager:
     def is_paused(self) -> bool:
         return self.state.status == "paused"
 
+    def _start_event_drain(self):
+        """Bind to the running loop and start the event drain task if needed"""
+        if self._drain_task is None or self._drain_task.done():
+            self._loop = asyncio.get_running_loop()
+            self._events = asyncio.Queue()
+            self._pending_droppable = 0
+            self._drain_task = asyncio.create_task(self._drain_events())
+
+    async def _drain_events(self):
+        """Broadcast queued browser-thread events in order"""
+        while True:
+            data, message = await self._events.get()
+            if data["type"] in DROPPABLE_EVENT_TYPES:
+                self._pending_droppable -= 1
+            await self._broadcast(data, message)
+
+    def _enqueue_event(self, data: Dict[str, Any], message: str):
+        """Queue an event for broadcast (event loop only)"""
+        if data["type"] in DROPPABLE_EVENT_TYPES:
+            if self._pending_droppable >= EVENT_QUEUE_SIZE:
+                # Clients can't keep up - drop progress frames rather than
+                # block the browser thread; status/error events still go out
+                logger.warning("Event queue full, dropping %s event", data["type"])
+                return
+            self._pending_droppable += 1
+        self._events.put_nowait((data, message))
+
+    def _emit(self, data: Dict[str, Any]):
+        """Send a message to all clients from the browser thread without blocking it"""
+        # Serialize here so large screenshot payloads are encoded on the
+        # browser thread rather than on the event loop
+        self._loop.call_soon_threadsafe(self._enqueue_event, data, dumps_json(data))
+
     async def start_agent(self, req: TaskRequest) -> str:
         """Start the browser automation agent"""
         self.task_id = str(uuid.uuid4())
@@ -82,13 +278,23 @@ class AgentManager:
         self.state.start_time = datetime.now()
         self.state.steps_completed = 0
         self.is_paused_flag = False
+        self._resume_event.set()
+        self._paused_at = None
+        self._paused_total = 0.0
+        self._cancel_event = threading.Event()
+        self._last_screenshot = None
+        self._start_event_drain()
         
-        # Start the agent task in background
-        asyncio.create_task(self._run_agent(req))
+        # Parse once up front; the browser run and the simulation fallback share it
+        instructions = self._parse_instructions(req.task)[:req.max_steps]
+        
+        # Start the agent task in background, keeping a handle so stop can cancel it
+        self._agent_task = asyncio.create_task(self._run_agent(req, instructions))
         return self.task_id
 
-    async def _run_agent(self, req: TaskRequest):
+    async def _run_agent(self, req: TaskRequest, instructions: List[Dict[str, str]]):
         """Main agent execution logic with Windows Python 3.13 workaround"""
+        cancel_event = self._cancel_event
         try:
             await self._broadcast({
                 "type": "status", 
@@ -96,372 +302,480 @@ class AgentManager:
                 "message": "Starting browser automation agent..."
             })
             
-            # Use sync Playwright in a thread to avoid asyncio subprocess issues
-            await self._run_sync_browser_task(req)
+            # Use sync Playwright in a thread to avoid asyncio subprocess issues;
+            # the whole task is bounded by its requested timeout
+            await self._run_with_deadline(self._run_sync_browser_task(req, instructions, cancel_event), req.timeout)
             
+        except asyncio.TimeoutError:
+            cancel_event.set()
+            # Wake a paused browser thread so it sees the cancel
+            self.is_paused_flag = False
+            self._resume_event.set()
+            logger.error("Agent timed out after %ss", req.timeout)
+            await self._broadcast({
+                "type": "error",
+                "message": f"Agent timed out after {req.timeout} seconds",
+                "timestamp": _timestamp()
+            })
+            self.state.status = "error"
         except Exception as e:
-            logger.error(f"Agent execution error: {e}")
+            logger.error("Agent execution error: %s", e)
             await self._broadcast({
                 "type": "error",
                 "message": f"Agent error: {str(e)}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _timestamp()
             })
             self.state.status = "error"
         finally:
             await self._cleanup()
 
-    async def _run_sync_browser_task(self, req: TaskRequest):
+    def _paused_seconds(self) -> float:
+        """Total time the current task has spent paused, including an ongoing pause"""
+        if self._paused_at is None:
+            return self._paused_total
+        return self._paused_total + time.monotonic() - self._paused_at
+
+    async def _run_with_deadline(self, coro, timeout: float):
+        """Await `coro`, raising asyncio.TimeoutError after `timeout` seconds of unpaused run time"""
+        task = asyncio.ensure_future(coro)
+        started = time.monotonic()
+        try:
+            while True:
+                remaining = timeout - (time.monotonic() - started - self._paused_seconds())
+                if remaining <= 0 and not self.is_paused_flag:
+                    raise asyncio.TimeoutError
+                # Pausing pushes the deadline back, so re-check it on waking
+                done, _ = await asyncio.wait({task}, timeout=max(remaining, DEADLINE_CHECK_INTERVAL))
+                if done:
+                    return task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def _run_sync_browser_task(self, req: TaskRequest, instructions: List[Dict[str, str]], cancel_event: threading.Event):
         """Run browser task using sync Playwright in executor to avoid asyncio issues"""
         
         if not PLAYWRIGHT_AVAILABLE:
-            await self._run_simulation_mode(req)
+            await self._run_simulation_mode(instructions)
             return
         
         # Run the sync browser automation in a thread executor
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         
         try:
-            await loop.run_in_executor(None, self._sync_browser_automation, req)
+            await loop.run_in_executor(self._browser_executor, self._sync_browser_automation, req, instructions, cancel_event)
         except Exception as e:
-            logger.error(f"Browser automation error: {e}")
+            logger.error("Browser automation error: %s", e)
+            if cancel_event.is_set():
+                return
             # Fallback to simulation mode
-            await self._run_simulation_mode(req)
+            await self._run_simulation_mode(instructions)
 
-    def _sync_browser_automation(self, req: TaskRequest):
+    def _sync_browser_automation(self, req: TaskRequest, instructions: List[Dict[str, str]], cancel_event: threading.Event):
         """Synchronous browser automation using sync Playwright"""
         try:
-            # Use sync Playwright to avoid asyncio subprocess issues
-            with sync_playwright() as playwright:
-                # Launch browser
-                browser = playwright.chromium.launch(
-                    headless=True,  # Keep headless for stability
-                    args=[
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage', 
-                        '--disable-web-security'
-                    ]
-                )
-                
-                context = browser.new_context(
-                    viewport={'width': 1280, 'height': 720}
-                )
-                page = context.new_page()
-                
+            # The browser is shared; each task gets a fresh context so no
+            # storage, cache or permissions carry over from the previous one
+            page = self._new_page()
+            # Always send the first frame of a new task
+            self._last_screenshot_digest = None
+            
+            try:
                 # Send initial status
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
-                        "type": "step",
-                        "message": "Browser started successfully",
-                        "action": "Browser ready"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                self._emit({
+                    "type": "step",
+                    "message": "Browser started successfully",
+                    "action": "Browser ready"
+                })
                 
                 # Navigate to URL
-                url = req.context.get("url", "about:blank")
-                if url and url != "about:blank":
-                    page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                    time.sleep(2)  # Wait for page to fully load
+                url = parse_url_from_context(req.context)
+                if url != "about:blank":
+                    page.goto(url, wait_until="domcontentloaded", timeout=NAVIGATION_TIMEOUT)
+                    self._wait_for_load(page)
                     
                     # Take screenshot
-                    screenshot = page.screenshot()
-                    screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+                    screenshot_data = self._capture_screenshot(page)
                     
-                    asyncio.run_coroutine_threadsafe(
-                        self._broadcast({
+                    if screenshot_data is not None:
+                        self._emit({
                             "type": "screenshot",
-                            "data": f"data:image/png;base64,{screenshot_b64}",
+                            "data": screenshot_data,
                             "description": f"Navigated to {url}"
-                        }),
-                        asyncio.get_event_loop()
-                    )
+                        })
                     
-                    asyncio.run_coroutine_threadsafe(
-                        self._broadcast({
-                            "type": "step",
-                            "message": f"Navigated to {url}",
-                            "action": f"Navigate to {url}"
-                        }),
-                        asyncio.get_event_loop()
-                    )
-                
-                # Parse and execute task instructions
-                instructions = self._parse_instructions(req.task)
+                    self._emit({
+                        "type": "step",
+                        "message": f"Navigated to {url}",
+                        "action": f"Navigate to {url}"
+                    })
                 
+                # Execute task instructions
                 for i, instruction in enumerate(instructions):
                     if self.is_paused_flag:
-                        while self.is_paused_flag and self.state.status == "paused":
-                            time.sleep(0.5)
+                        # Released by resume, stop or timeout
+                        self._resume_event.wait()
+                    
+                    # Stopped or timed out - abandon the remaining steps
+                    if cancel_event.is_set():
+                        logger.info("Browser task cancelled")
+                        return
                     
+                    self._pace_host(page, instruction)
                     self._execute_sync_instruction(page, instruction, i + 1)
-                    time.sleep(1.5)  # Longer delay between actions
+                
+                # Stopped or timed out during the last step - don't report completion
+                if cancel_event.is_set():
+                    logger.info("Browser task cancelled")
+                    return
                 
                 # Final screenshot
-                screenshot = page.screenshot()
-                screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+                screenshot_data = self._capture_screenshot(page)
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
+                if screenshot_data is not None:
+                    self._emit({
                         "type": "screenshot",
-                        "data": f"data:image/png;base64,{screenshot_b64}",
+                        "data": screenshot_data,
                         "description": "Task completed"
-                    }),
-                    asyncio.get_event_loop()
-                )
-                
-                browser.close()
+                    })
                 
                 # Mark as completed
                 self.state.status = "completed"
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
-                        "type": "status",
-                        "status": "completed", 
-                        "message": "Task completed successfully"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                self._emit({
+                    "type": "status",
+                    "status": "completed", 
+                    "message": "Task completed successfully"
+                })
+            finally:
+                self._close_page()
                 
         except Exception as e:
-            logger.error(f"Sync browser error: {e}")
-            asyncio.run_coroutine_threadsafe(
-                self._broadcast({
-                    "type": "error",
-                    "message": f"Browser error: {str(e)}"
-                }),
-                asyncio.get_event_loop()
-            )
+            logger.error("Sync browser error: %s", e)
+            self._emit({
+                "type": "error",
+                "message": f"Browser error: {str(e)}"
+            })
             raise
 
+    def _is_current_url(self, page, url: str) -> bool:
+        """Check whether the page already shows `url` (compared in canonical form)"""
+        return canonical_url(page.url) == canonical_url(url)
+
+    def _pace_host(self, page, instruction: Dict[str, str]):
+        """Keep at least STEP_MIN_INTERVAL between actions against the same host (browser thread only)"""
+        if instruction["action"] == "navigate":
+            host = urlsplit(normalize_url(instruction["url"])).netloc.lower()
+        else:
+            host = urlsplit(page.url).netloc
+        if not host:
+            return
+        
+        # Time already spent in the previous action counts toward the interval,
+        # and a different host doesn't have to wait at all
+        now = time.monotonic()
+        wait = self._host_next_ok.get(host, 0) - now
+        if wait > 0:
+            time.sleep(wait)
+            now += wait
+        self._host_next_ok[host] = now + STEP_MIN_INTERVAL
+
+    def _wait_for_load(self, page):
+        """Wait for images/styles after a navigation, up to NAVIGATION_LOAD_TIMEOUT"""
+        # goto() already returned at DOMContentLoaded; give the subresources a
+        # bounded chance to finish so the screenshot isn't a blank layout
+        try:
+            page.wait_for_load_state("load", timeout=NAVIGATION_LOAD_TIMEOUT)
+        except Exception:
+            # Slow ad/tracker requests - the DOM is usable, carry on
+            pass
+
+    def _wait_for_settle(self, page):
+        """Wait for the page's load event after an action, up to ACTION_SETTLE_TIMEOUT"""
+        # Actions that trigger a navigation return once it has started, so this
+        # waits for that load on slow pages and returns at once on loaded ones.
+        # Not networkidle: beacons and long polling would always hit the timeout
+        try:
+            page.wait_for_load_state("load", timeout=ACTION_SETTLE_TIMEOUT)
+        except Exception:
+            # Slow ad/tracker requests - the DOM is usable, carry on
+            pass
+
+    def _capture_screenshot(self, page) -> Optional[str]:
+        """Capture the viewport as a base64 data URL for the UI, or None if it hasn't changed"""
+        # JPEG is several times smaller than PNG to encode, base64 and push
+        # over the WebSocket, and the quality loss is invisible at preview size
+        screenshot = page.screenshot(type="jpeg", quality=SCREENSHOT_QUALITY)
+        
+        # Waits and failed clicks often leave the page untouched - compare a
+        # digest of the raw bytes and skip re-encoding/re-sending the same frame
+        digest = hash(screenshot)
+        if digest == self._last_screenshot_digest:
+            return None
+        self._last_screenshot_digest = digest
+        
+        screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+        return f"data:image/jpeg;base64,{screenshot_b64}"
+
+    def _get_browser(self):
+        """Return the shared browser, launching it on first use (browser thread only)"""
+        if self.browser is not None and self.browser.is_connected():
+            return self.browser
+        
+        if self.playwright_instance is None:
+            # Use sync Playwright to avoid asyncio subprocess issues
+            self.playwright_instance = sync_playwright().start()
+        
+        self.browser = self.playwright_instance.chromium.launch(
+            headless=True,  # Keep headless for stability
+            args=[
+                '--no-sandbox',
+                '--disable-dev-shm-usage', 
+                '--disable-web-security'
+            ]
+        )
+        return self.browser
+
+    def _new_page(self):
+        """Open a page in a new context on the shared browser for one task (browser thread only)"""
+        browser = self._get_browser()
+        context = browser.new_context(
+            viewport={'width': 1280, 'height': 720}
+        )
+        self.page = context.new_page()
+        return self.page
+
+    def _close_page(self):
+        """Close the task's page along with its context (browser thread only)"""
+        if self.page is None:
+            return
+        
+        try:
+            self.page.context.close()
+        except Exception as e:
+            logger.warning("Could not close browser context: %s", e)
+        finally:
+            self.page = None
+
+    def _close_browser(self):
+        """Close the shared browser and Playwright driver (browser thread only)"""
+        try:
+            if self.page is not None:
+                self.page.context.close()
+            if self.browser is not None:
+                self.browser.close()
+            if self.playwright_instance is not None:
+                self.playwright_instance.stop()
+        except Exception as e:
+            logger.error("Browser shutdown error: %s", e)
+        finally:
+            self.page = None
+            self.browser = None
+            self.playwright_instance = None
+
     def _execute_sync_instruction(self, page, instruction: Dict[str, str], step_num: int):
         """Execute a single instruction synchronously"""
         action = instruction["action"]
         
         try:
             if action == "navigate":
-                url = instruction["url"]
-                page.goto(url, wait_until="domcontentloaded")
-                time.sleep(2)
+                url = normalize_url(instruction["url"])
                 
-                screenshot = page.screenshot()
-                screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+                # Skip the round-trip when the page is already there
+                if not self._is_current_url(page, url):
+                    page.goto(url, wait_until="domcontentloaded", timeout=NAVIGATION_TIMEOUT)
+                    self._wait_for_load(page)
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
-                        "type": "step",
-                        "message": f"Step {step_num}: Navigated to {url}",
-                        "action": f"Navigate to {url}"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                screenshot_data = self._capture_screenshot(page)
+                
+                self._emit({
+                    "type": "step",
+                    "message": f"Step {step_num}: Navigated to {url}",
+                    "action": f"Navigate to {url}"
+                })
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
+                if screenshot_data is not None:
+                    self._emit({
                         "type": "screenshot",
-                        "data": f"data:image/png;base64,{screenshot_b64}",
+                        "data": screenshot_data,
                         "description": f"Step {step_num}: Navigated to {url}"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                    })
                 
             elif action == "search":
                 query = instruction["query"]
                 
-                # Try multiple search strategies
-                search_selectors = [
-                    'input[name="q"]',  # Google search box
-                    'input[type="search"]',
-                    'input[placeholder*="Search" i]',
-                    'input[placeholder*="search" i]',
-                    'input[aria-label*="Search" i]',
-                    'input[title*="Search" i]',
-                    '#search',
-                    '.search-input',
-                    '[data-testid="search"]'
-                ]
-                
+                # One locator over every candidate selector: Playwright waits for
+                # the first visible match instead of probing each selector in turn
                 searched = False
-                for selector in search_selectors:
-                    try:
-                        search_box = page.wait_for_selector(selector, timeout=3000)
-                        if search_box:
-                            search_box.click()
-                            time.sleep(0.5)
-                            search_box.fill(query)
-                            time.sleep(0.5)
-                            
-                            # Try to submit the search
-                            search_box.press("Enter")
-                            time.sleep(3)  # Wait for search results
-                            searched = True
-                            break
-                    except Exception as e:
-                        logger.debug(f"Search selector {selector} failed: {e}")
-                        continue
+                try:
+                    search_box = page.locator(_SEARCH_BOX_SELECTOR).first
+                    search_box.wait_for(state="visible", timeout=3000)
+                    search_box.click()
+                    search_box.fill(query)
+                    
+                    # Try to submit the search, then wait for the results to load
+                    search_box.press("Enter")
+                    self._wait_for_settle(page)
+                    searched = True
+                except Exception as e:
+                    logger.debug("Search box lookup failed: %s", e)
                 
                 message = f"Step {step_num}: Searched for '{query}'" if searched else f"Step {step_num}: Could not find search box"
                 msg_type = "step" if searched else "warning"
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
-                        "type": msg_type,
-                        "message": message,
-                        "action": f"Search for {query}"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                self._emit({
+                    "type": msg_type,
+                    "message": message,
+                    "action": f"Search for {query}"
+                })
                 
-                screenshot = page.screenshot()
-                screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+                screenshot_data = self._capture_screenshot(page)
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
+                if screenshot_data is not None:
+                    self._emit({
                         "type": "screenshot",
-                        "data": f"data:image/png;base64,{screenshot_b64}",
+                        "data": screenshot_data,
                         "description": f"Step {step_num}: Search for {query}"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                    })
                 
             elif action == "fill":
                 field = instruction["field"]
                 value = instruction["value"]
                 
-                # Try multiple selector strategies
-                selectors = [
-                    f'input[name="{field}"]',
-                    f'input[id="{field}"]', 
-                    f'input[placeholder*="{field}" i]',
-                    f'input[aria-label*="{field}" i]',
-                    f'[name="{field}"]',
-                    f'#{field}',
-                    f'textarea[name="{field}"]',
-                    f'textarea[placeholder*="{field}" i]'
-                ]
-                
+                # Snapshot every form field in one round-trip and match in Python
                 filled = False
-                for selector in selectors:
+                index = self._find_form_field(page, field)
+                if index is not None:
                     try:
-                        element = page.wait_for_selector(selector, timeout=2000)
-                        if element:
-                            element.click()
-                            time.sleep(0.3)
-                            element.fill(value)
-                            filled = True
-                            break
-                    except:
-                        continue
+                        element = page.locator(_FORM_FIELD_SELECTOR).nth(index)
+                        element.click()
+                        time.sleep(0.3)
+                        element.fill(value)
+                        filled = True
+                    except Exception as e:
+                        logger.debug("Filling field '%s' failed: %s", field, e)
                 
                 message = f"Step {step_num}: Filled '{field}' with '{value}'" if filled else f"Step {step_num}: Could not find field '{field}'"
                 msg_type = "step" if filled else "warning"
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
-                        "type": msg_type,
-                        "message": message,
-                        "action": f"Fill {field}"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                self._emit({
+                    "type": msg_type,
+                    "message": message,
+                    "action": f"Fill {field}"
+                })
                 
-                screenshot = page.screenshot()
-                screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+                screenshot_data = self._capture_screenshot(page)
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
+                if screenshot_data is not None:
+                    self._emit({
                         "type": "screenshot",
-                        "data": f"data:image/png;base64,{screenshot_b64}",
+                        "data": screenshot_data,
                         "description": f"Step {step_num}: Fill {field}"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                    })
                 
             elif action == "click":
                 element_text = instruction["element"]
                 
-                # Enhanced click strategies
-                click_strategies = [
-                    # First result specific selectors
-                    ('h3:first-of-type', 'first result heading'),
-                    ('a[href]:has(h3):first-of-type', 'first result link with heading'),
-                    ('.g:first-of-type a[href]', 'first Google result link'),
-                    ('[data-testid="result"]:first-of-type a', 'first result by test id'),
-                    
-                    # Button and link selectors
-                    (f'button:has-text("{element_text}")', 'button with text'),
-                    (f'input[type="submit"][value*="{element_text}" i]', 'submit button'),
-                    (f'input[type="button"][value*="{element_text}" i]', 'input button'),
-                    (f'a:has-text("{element_text}")', 'link with text'),
-                    (f'[role="button"]:has-text("{element_text}")', 'role button'),
-                    
-                    # Generic selectors
-                    (f'*:text-is("{element_text}")', 'exact text match'),
-                    (f'*:text("{element_text}")', 'partial text match')
-                ]
-                
                 clicked = False
-                for selector, description in click_strategies:
+                for template, description in _CLICK_STRATEGIES:
+                    # Only the strategies actually tried get formatted
+                    selector = template.format(text=element_text)
                     try:
                         element = page.wait_for_selector(selector, timeout=2000)
                         if element and element.is_visible():
                             element.click()
-                            time.sleep(2)  # Wait after click
+                            self._wait_for_settle(page)
                             clicked = True
-                            logger.info(f"Clicked using {description}: {selector}")
+                            logger.info("Clicked using %s: %s", description, selector)
                             break
                     except Exception as e:
-                        logger.debug(f"Click strategy '{description}' failed: {e}")
+                        logger.debug("Click strategy '%s' failed: %s", description, e)
                         continue
                 
                 message = f"Step {step_num}: Clicked '{element_text}'" if clicked else f"Step {step_num}: Could not find element '{element_text}'"
                 msg_type = "step" if clicked else "warning"
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
-                        "type": msg_type,
-                        "message": message,
-                        "action": f"Click {element_text}"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                self._emit({
+                    "type": msg_type,
+                    "message": message,
+                    "action": f"Click {element_text}"
+                })
                 
-                screenshot = page.screenshot()
-                screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+                screenshot_data = self._capture_screenshot(page)
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
+                if screenshot_data is not None:
+                    self._emit({
                         "type": "screenshot",
-                        "data": f"data:image/png;base64,{screenshot_b64}",
+                        "data": screenshot_data,
                         "description": f"Step {step_num}: Click {element_text}"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                    })
                 
             elif action == "wait":
                 duration = int(instruction["duration"])
                 time.sleep(duration)
                 
-                asyncio.run_coroutine_threadsafe(
-                    self._broadcast({
-                        "type": "step",
-                        "message": f"Step {step_num}: Waited {duration} seconds",
-                        "action": f"Wait {duration}s"
-                    }),
-                    asyncio.get_event_loop()
-                )
+                self._emit({
+                    "type": "step",
+                    "message": f"Step {step_num}: Waited {duration} seconds",
+                    "action": f"Wait {duration}s"
+                })
                 
         except Exception as e:
-            logger.error(f"Error executing instruction {instruction}: {e}")
-            asyncio.run_coroutine_threadsafe(
-                self._broadcast({
-                    "type": "error",
-                    "message": f"Step {step_num} failed: {str(e)}",
-                    "action": f"Error in {action}"
-                }),
-                asyncio.get_event_loop()
-            )
-
-    async def _run_simulation_mode(self, req: TaskRequest):
+            logger.error("Error executing instruction %s: %s", instruction, e)
+            self._emit({
+                "type": "error",
+                "message": f"Step {step_num} failed: {str(e)}",
+                "action": f"Error in {action}"
+            })
+
+    def _find_form_field(self, page, field: str) -> Optional[int]:
+        """Return the index of the visible form field best matching `field`"""
+        try:
+            page.wait_for_selector(_FORM_FIELD_SELECTOR, timeout=2000)
+            fields = page.locator(_FORM_FIELD_SELECTOR).evaluate_all(_FORM_FIELDS_JS)
+        except Exception as e:
+            logger.debug("Form field snapshot failed: %s", e)
+            return None
+        
+        field_lower = field.lower()
+        
+        # Index exact name/id matches in one pass (first in document order
+        # wins) so those lookups don't rescan the field list
+        input_by_name: Dict[str, int] = {}
+        input_by_id: Dict[str, int] = {}
+        any_by_name_or_id: Dict[str, int] = {}
+        visible_fields = []
+        for f in fields:
+            if not f["visible"]:
+                continue
+            visible_fields.append(f)
+            if f["tag"] == "input":
+                input_by_name.setdefault(f["name"], f["index"])
+                input_by_id.setdefault(f["id"], f["index"])
+            any_by_name_or_id.setdefault(f["name"], f["index"])
+            any_by_name_or_id.setdefault(f["id"], f["index"])
+        
+        # Same precedence as the old per-selector lookups: exact name/id on
+        # inputs, then fuzzy placeholder/label, then any tag, then textareas
+        if field in input_by_name:
+            return input_by_name[field]
+        if field in input_by_id:
+            return input_by_id[field]
+        
+        for key in ("placeholder", "label"):
+            for f in visible_fields:
+                if f["tag"] == "input" and field_lower in f[key].lower():
+                    return f["index"]
+        
+        if field in any_by_name_or_id:
+            return any_by_name_or_id[field]
+        
+        for f in visible_fields:
+            if f["tag"] == "textarea" and field_lower in f["placeholder"].lower():
+                return f["index"]
+        
+        return None
+
+    async def _run_simulation_mode(self, instructions: List[Dict[str, str]]):
         """Fallback simulation mode when Playwright is not available"""
         await self._broadcast({
             "type": "step",
@@ -469,17 +783,15 @@ class AgentManager:
             "action": "Simulation mode"
         })
         
-        instructions = self._parse_instructions(req.task)
-        
         for i, instruction in enumerate(instructions):
             if self.is_paused_flag:
-                while self.is_paused_flag and self.state.status == "paused":
-                    await asyncio.sleep(0.5)
+                await asyncio.to_thread(self._resume_event.wait)
             
             await asyncio.sleep(1)
+            detail = next((instruction[key] for key in _INSTRUCTION_DETAIL_KEYS if key in instruction), "action")
             await self._broadcast({
                 "type": "step",
-                "message": f"Step {i+1}: Simulating {instruction['action']} - {instruction.get('query', instruction.get('field', instruction.get('element', instruction.get('url', 'action'))))}",
+                "message": f"Step {i+1}: Simulating {instruction['action']} - {detail}",
                 "action": f"Simulate {instruction['action']}"
             })
         
@@ -495,31 +807,28 @@ class AgentManager:
         instructions = []
         task_lower = task.lower().strip()
         
-        logger.info(f"Parsing task: {task}")
+        logger.info("Parsing task: %s", task)
         
         # Handle search queries specifically
-        search_patterns = [
-            r'search\s+for\s+[\'"]([^"\']+)[\'"](?:\s+(?:and|then)\s+click\s+(?:on\s+)?(?:the\s+)?([^,\.]+))?',
-            r'search\s+[\'"]([^"\']+)[\'"](?:\s+(?:and|then)\s+click\s+(?:on\s+)?(?:the\s+)?([^,\.]+))?',
-            r'look\s+(?:up|for)\s+[\'"]([^"\']+)[\'"](?:\s+(?:and|then)\s+click\s+(?:on\s+)?(?:the\s+)?([^,\.]+))?'
-        ]
-        
-        for pattern in search_patterns:
-            match = re.search(pattern, task_lower)
-            if match:
-                query = match.group(1)
-                instructions.append({"action": "search", "query": query})
-                
-                # If there's a click instruction after the search
-                if match.group(2):
-                    click_target = match.group(2).strip()
-                    instructions.append({"action": "click", "element": click_target})
-                
-                logger.info(f"Parsed search instruction: search for '{query}'" + (f" then click '{click_target}'" if match.group(2) else ""))
-                return instructions
+        match = next(filter(None, (pattern.search(task_lower) for pattern in _SEARCH_TASK_RES)), None)
+        if match:
+            query = match.group(1)
+            instructions.append({"action": "search", "query": query})
+            
+            # If there's a click instruction after the search
+            if match.group(2):
+                click_target = match.group(2).strip()
+                instructions.append({"action": "click", "element": click_target})
+            
+            if match.group(2):
+                logger.info("Parsed search instruction: search for '%s' then click '%s'", query, click_target)
+            else:
+                logger.info("Parsed search instruction: search for '%s'", query)
+            return instructions
         
-        # If not a search, split by common delimiters and parse each part
-        steps = re.split(r'[;,\n]|(?:\s+(?:then|and then|next|after that)\s+)', task, flags=re.IGNORECASE)
+        # If not a search, split by common delimiters and parse each part;
+        # splitting the already-lowered task saves lowering every step again
+        steps = _STEP_SPLIT_RE.split(task_lower)
         
         for step in steps:
             step = step.strip()
@@ -530,33 +839,24 @@ class AgentManager:
             if instruction:
                 instructions.append(instruction)
         
-        logger.info(f"Parsed {len(instructions)} instructions: {instructions}")
+        logger.info("Parsed %s instructions: %s", len(instructions), instructions)
         return instructions
 
-    def _parse_single_instruction(self, step: str) -> Optional[Dict[str, str]]:
-        """Parse a single instruction step with enhanced patterns"""
-        step = step.strip()
-        step_lower = step.lower()
-        
+    def _parse_single_instruction(self, step_lower: str) -> Optional[Dict[str, str]]:
+        """Parse a single lowercased, stripped instruction step with enhanced patterns"""
         # Search instruction
-        search_match = re.search(r'search\s+(?:for\s+)?[\'"]([^"\']+)[\'"]', step_lower)
+        search_match = _STEP_SEARCH_RE.search(step_lower)
         if search_match:
             return {"action": "search", "query": search_match.group(1)}
         
         # Navigate to URL
-        url_match = re.search(r'(?:go to|navigate to|visit|open)\s+([^\s,;]+)', step_lower)
+        url_match = _STEP_NAVIGATE_RE.search(step_lower)
         if url_match:
             return {"action": "navigate", "url": url_match.group(1)}
         
         # Fill input field - enhanced patterns
-        fill_patterns = [
-            r'(?:enter|type|input)\s+[\'"]([^"\']+)["\']\s+(?:into|in)\s+(?:the\s+)?[\'"]?([^"\']+)[\'"]?\s*(?:field|input|box)?',
-            r'fill\s+[\'"]?([^"\']+)[\'"]?\s+(?:field\s+)?with\s+[\'"]([^"\']+)[\'"]',
-            r'(?:fill|enter)\s+([^"\']+)\s+(?:field|input)?\s*(?:with|as)\s+[\'"]([^"\']+)[\'"]'
-        ]
-        
-        for pattern in fill_patterns:
-            fill_match = re.search(pattern, step_lower)
+        for pattern in _STEP_FILL_RES:
+            fill_match = pattern.search(step_lower)
             if fill_match:
                 if 'with' in step_lower:
                     return {"action": "fill", "field": fill_match.group(1), "value": fill_match.group(2)}
@@ -564,24 +864,18 @@ class AgentManager:
                     return {"action": "fill", "value": fill_match.group(1), "field": fill_match.group(2)}
         
         # Click button/element - enhanced patterns
-        click_patterns = [
-            r'click\s+(?:on\s+)?(?:the\s+)?[\'"]?([^"\']+)[\'"]?(?:\s+(?:button|link|result))?',
-            r'(?:press|tap)\s+(?:the\s+)?[\'"]?([^"\']+)[\'"]?',
-            r'select\s+(?:the\s+)?[\'"]?([^"\']+)[\'"]?'
-        ]
-        
-        for pattern in click_patterns:
-            click_match = re.search(pattern, step_lower)
+        for pattern in _STEP_CLICK_RES:
+            click_match = pattern.search(step_lower)
             if click_match:
                 return {"action": "click", "element": click_match.group(1)}
         
         # Wait instruction
-        wait_match = re.search(r'wait\s+(\d+)\s*(?:seconds?|ms)?', step_lower)
+        wait_match = _STEP_WAIT_RE.search(step_lower)
         if wait_match:
             return {"action": "wait", "duration": wait_match.group(1)}
         
         # Submit/press enter
-        if any(keyword in step_lower for keyword in ['submit', 'press enter', 'hit enter']):
+        if any(keyword in step_lower for keyword in _SUBMIT_KEYWORDS):
             return {"action": "submit"}
         
         return None
@@ -589,6 +883,9 @@ class AgentManager:
     async def pause_agent(self):
         """Pause the agent"""
         self.is_paused_flag = True
+        self._resume_event.clear()
+        if self._paused_at is None:
+            self._paused_at = time.monotonic()
         self.state.status = "paused"
         await self._broadcast({
             "type": "status",
@@ -600,6 +897,10 @@ class AgentManager:
     async def resume_agent(self):
         """Resume the agent"""
         self.is_paused_flag = False
+        self._resume_event.set()
+        if self._paused_at is not None:
+            self._paused_total += time.monotonic() - self._paused_at
+            self._paused_at = None
         self.state.status = "running"
         await self._broadcast({
             "type": "status",
@@ -611,6 +912,10 @@ class AgentManager:
     async def stop_agent(self):
         """Stop the agent"""
         self.state.status = "stopping"
+        self._cancel_event.set()
+        self._resume_event.set()
+        if self._agent_task is not None and not self._agent_task.done():
+            self._agent_task.cancel()
         await self._broadcast({
             "type": "status",
             "status": "stopping",
@@ -631,10 +936,39 @@ class AgentManager:
     async def _cleanup(self):
         """Clean up browser resources"""
         try:
-            # Cleanup is handled by the context manager in sync mode
+            # Task contexts are closed by the browser thread; the shared
+            # browser itself is released in shutdown()
             pass
         except Exception as e:
-            logger.error(f"Cleanup error: {e}")
+            logger.error("Cleanup error: %s", e)
+
+    async def warm_up(self):
+        """Start the event drain and launch the browser before the first task"""
+        self._start_event_drain()
+        if PLAYWRIGHT_AVAILABLE:
+            # Fire and forget - the first task simply queues behind the launch
+            self._browser_executor.submit(self._warm_browser)
+
+    def _warm_browser(self):
+        """Launch the shared browser ahead of time (browser thread only)"""
+        try:
+            self._get_browser()
+        except Exception as e:
+            # Not fatal; the first task will try again (or fall back to simulation)
+            logger.warning("Browser warm-up failed: %s", e)
+
+    async def shutdown(self):
+        """Release the shared browser when the application stops"""
+        # Stop any running task and wake it if paused, otherwise it holds the
+        # browser thread and _close_browser never gets to run
+        self._cancel_event.set()
+        self._resume_event.set()
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+        if PLAYWRIGHT_AVAILABLE:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._browser_executor, self._close_browser)
+        self._browser_executor.shutdown(wait=False)
 
     def get_status(self) -> Dict[str, Any]:
         """Get current agent status"""
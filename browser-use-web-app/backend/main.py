@@ -1,13 +1,13 @@
 import asyncio
-import json
 import uuid
 import sys
 from datetime import datetime
 from pathlib import Path
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 # Fix Windows asyncio subprocess issue
 if sys.platform.startswith("win"):
@@ -15,11 +15,23 @@ if sys.platform.startswith("win"):
 
 from backend.agent_manager import AgentManager
 from backend.models import TaskRequest
-from backend.utils import process_file, validate_api_key, setup_logging
+from backend.utils import ORJSON_AVAILABLE, dumps_json, get_upload_size, loads_json, process_file, validate_api_key, setup_logging, stop_logging
 
 logger = setup_logging()
 
-app = FastAPI(title="Browser-Use Web Interface")
+MAX_UPLOAD_BYTES = 10_000_000
+
+# Responses smaller than this aren't worth compressing
+GZIP_MIN_BYTES = 1000
+
+# Keep-alive reply is always the same, so serialize it once
+_PONG_MESSAGE = dumps_json({"type": "pong"})
+
+# Encode JSON API responses (including large upload contents) with orjson when installed
+app = FastAPI(
+    title="Browser-Use Web Interface",
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+)
 
 # Simple CORS setup without complex settings
 app.add_middleware(
@@ -30,6 +42,10 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Compress larger HTTP responses (static JS/CSS, extracted upload text);
+# level 1 keeps the CPU cost per response low. WebSocket frames are unaffected
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=1)
+
 # Static files - pointing to frontend directory
 static_dir = Path(__file__).parent.parent / "frontend"
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
@@ -37,6 +53,17 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 # Global agent manager
 manager = AgentManager()
 
+@app.on_event("startup")
+async def startup_event():
+    """Launch the shared browser so the first task doesn't pay for it"""
+    await manager.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared browser and flush pending logs on application shutdown"""
+    await manager.shutdown()
+    stop_logging()
+
 @app.get("/", response_class=HTMLResponse)
 async def get_ui():
     return FileResponse(static_dir / "index.html")
@@ -57,7 +84,7 @@ async def start_agent(req: TaskRequest):
         return {"status": "started", "task_id": task_id}
     
     except Exception as e:
-        logger.error(f"Error starting agent: {e}")
+        logger.error("Error starting agent: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/agent/pause")
@@ -87,33 +114,37 @@ async def stop_agent():
 @app.post("/api/v1/upload")
 async def upload_file(file: UploadFile = File(...)):
     """Upload and process a file"""
-    if file.size and file.size > 10_000_000:  # 10MB limit
+    # file.size is absent for chunked uploads, so fall back to measuring the
+    # spooled file - either way nothing is read into memory before the check
+    size = file.size if file.size is not None else get_upload_size(file)
+    if size > MAX_UPLOAD_BYTES:  # 10MB limit
         raise HTTPException(status_code=400, detail="File too large (max 10MB)")
     
     try:
         content = await process_file(file)
         return {"filename": file.filename, "content": content}
     except Exception as e:
-        logger.error(f"Error processing file {file.filename}: {e}")
+        logger.error("Error processing file %s: %s", file.filename, e)
         raise HTTPException(status_code=500, detail=f"Error processing file: {e}")
 
 @app.websocket("/ws/agent-stream")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time agent updates"""
-    await manager.connect(websocket)
+    if not await manager.connect(websocket):
+        return
     try:
         while True:
             data = await websocket.receive_text()
             try:
-                message = json.loads(data)
+                message = loads_json(data)
                 if message.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON received: {data}")
+                    await websocket.send_text(_PONG_MESSAGE)
+            except ValueError:
+                logger.warning("Invalid JSON received: %s", data)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
         manager.disconnect(websocket)
 
 @app.get("/api/v1/agent/status")
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -27,16 +28,18 @@ class TaskRequest(BaseModel):
             }
         }
 
-class AgentState(BaseModel):
-    """Current state of the agent"""
-    status: str = Field(default="idle", description="Current status: idle, running, paused, completed, error")
-    steps_completed: int = Field(default=0, description="Number of steps completed")
-    current_action: str = Field(default="", description="Current action being performed")
-    start_time: Optional[datetime] = Field(default=None, description="When the task started")
-    error_message: Optional[str] = Field(default=None, description="Error message if any")
+@dataclass(slots=True)
+class AgentState:
+    """Current state of the agent
     
-    class Config:
-        arbitrary_types_allowed = True
+    Plain slotted dataclass rather than a pydantic model: it is internal,
+    mutable state that is read and written constantly and never validated.
+    """
+    status: str = "idle"  # idle, running, paused, stopping, completed, error
+    steps_completed: int = 0
+    current_action: str = ""
+    start_time: Optional[datetime] = None
+    error_message: Optional[str] = None
 
 class AgentResponse(BaseModel):
     """Response from agent operations"""
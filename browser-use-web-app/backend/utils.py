@@ -1,79 +1,167 @@
+import asyncio
+import json
 import logging
+import random
 import re
 import io
-from typing import Any, Dict
+import queue
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
 from fastapi import UploadFile
 
+# orjson is optional - fall back to the stdlib encoder when it is not installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# agent.log rotates at LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files
+LOG_MAX_BYTES = 5_000_000
+LOG_BACKUP_COUNT = 3
+
+# Background thread that performs the actual console/file writes
+_log_listener = None
+
 def setup_logging():
-    """Setup logging configuration"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler("agent.log")
-        ]
-    )
+    """Setup logging configuration
+    
+    Records are handed to a queue and written to the console and agent.log
+    by a background thread, so logging never blocks the event loop on disk I/O.
+    """
+    global _log_listener
+    if _log_listener is None:
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        file_handler = RotatingFileHandler("agent.log", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        
+        log_queue = queue.SimpleQueue()
+        _log_listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+        _log_listener.start()
+        # QueueHandler.prepare() bakes its formatter's output into record.msg;
+        # pass the bare message so the listener's handlers format it only once
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
     return logging.getLogger("agent_manager")
 
+def stop_logging():
+    """Flush queued log records and stop the background writer"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            # Closes the agent.log stream
+            handler.close()
+        _log_listener = None
+
+def dumps_json(data: Any) -> str:
+    """Serialize data to a JSON string, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=str).decode("utf-8")
+    # Match orjson's output: compact separators, and non-ASCII text as-is
+    # instead of \uXXXX escapes
+    return json.dumps(data, default=str, ensure_ascii=False, separators=(",", ":"))
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    """Parse a JSON string, using orjson when available
+    
+    Both parsers raise a ValueError subclass on invalid input.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Per-provider API key format checks; providers not listed only need a non-empty key
+_API_KEY_CHECKS = {
+    # OpenAI API keys start with 'sk-' and are typically 51 characters long
+    "openai": re.compile(r"sk-[A-Za-z0-9]{48}").fullmatch,
+    # Google Gemini API keys are typically 39 characters - more lenient check
+    "gemini": lambda key: len(key) >= 20,
+    # Anthropic API keys start with 'sk-ant-'
+    "anthropic": re.compile(r"sk-ant-[A-Za-z0-9\-_]{95,}").fullmatch,
+}
+
 def validate_api_key(api_key: str, provider: str) -> bool:
     """Validate API key format based on provider"""
-    if not api_key or not api_key.strip():
+    api_key = api_key.strip() if api_key else ""
+    if not api_key:
         return False
     
-    if provider == "openai":
-        # OpenAI API keys start with 'sk-' and are typically 51 characters long
-        return bool(re.match(r"^sk-[A-Za-z0-9]{48}$", api_key.strip()))
-    
-    elif provider == "gemini":
-        # Google Gemini API keys are typically 39 characters
-        return len(api_key.strip()) >= 20  # More lenient check
-    
-    elif provider == "anthropic":
-        # Anthropic API keys start with 'sk-ant-'
-        return bool(re.match(r"^sk-ant-[A-Za-z0-9\-_]{95,}$", api_key.strip()))
+    check = _API_KEY_CHECKS.get(provider)
+    return bool(check(api_key)) if check else True
+
+def get_upload_size(file: UploadFile) -> int:
+    """Return the size of an uploaded file without reading it"""
+    position = file.file.tell()
+    file.file.seek(0, io.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
+
+# Upload content types decoded as plain text / parsed as spreadsheets
+TEXT_CONTENT_TYPES = frozenset({"text/plain", "text/csv", "application/json"})
+EXCEL_CONTENT_TYPES = frozenset({
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+})
+
+def _extract_pdf_text(fileobj) -> str:
+    """Extract the text of every PDF page (runs in a worker thread)"""
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(fileobj)
+    # Build the text in one pass instead of re-copying the growing string per page
+    return "".join(f"{page.extract_text() or ''}\n" for page in pdf_reader.pages)
+
+def _extract_excel_text(fileobj) -> str:
+    """Render the active sheet as tab-separated text (runs in a worker thread)"""
+    import openpyxl
     
-    # For other providers, just check it's not empty
-    return len(api_key.strip()) > 0
+    # read_only streams rows without building the full cell/style object model
+    workbook = openpyxl.load_workbook(fileobj, read_only=True)
+    try:
+        sheet = workbook.active
+        
+        # Convert to text representation
+        return "".join(
+            "\t".join("" if cell is None else str(cell) for cell in row) + "\n"
+            for row in sheet.iter_rows(values_only=True)
+        )
+    finally:
+        workbook.close()
 
 async def process_file(file: UploadFile) -> str:
     """Process uploaded file and return content as string"""
     try:
-        content = await file.read()
-        
+        # PDF and Excel parsers read straight from the spooled upload, so the
+        # file isn't copied into a bytes object and then again into a BytesIO
         if file.content_type == "application/pdf":
             # Handle PDF files
             try:
-                import PyPDF2
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-                text_content = ""
-                for page in pdf_reader.pages:
-                    text_content += page.extract_text() + "\n"
-                return text_content
+                await file.seek(0)
+                # Parsing is CPU-bound; keep it off the event loop
+                return await asyncio.to_thread(_extract_pdf_text, file.file)
             except ImportError:
                 return "PDF processing not available - PyPDF2 not installed"
             except Exception as e:
                 return f"Error processing PDF: {str(e)}"
         
-        elif file.content_type in ["text/plain", "text/csv", "application/json"]:
+        elif file.content_type in TEXT_CONTENT_TYPES:
             # Handle text files
+            content = await file.read()
             return content.decode('utf-8', errors='ignore')
         
-        elif file.content_type in ["application/vnd.ms-excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"]:
+        elif file.content_type in EXCEL_CONTENT_TYPES:
             # Handle Excel files using openpyxl instead of pandas
             try:
-                import openpyxl
-                from io import BytesIO
-                
-                workbook = openpyxl.load_workbook(BytesIO(content))
-                sheet = workbook.active
-                
-                # Convert to text representation
-                text_content = ""
-                for row in sheet.iter_rows(values_only=True):
-                    text_content += "\t".join(str(cell) if cell is not None else "" for cell in row) + "\n"
-                
-                return text_content
+                await file.seek(0)
+                return await asyncio.to_thread(_extract_excel_text, file.file)
             except ImportError:
                 return "Excel processing not available - openpyxl not installed"
             except Exception as e:
@@ -82,106 +170,217 @@ async def process_file(file: UploadFile) -> str:
         else:
             # Try to decode as text for unknown types
             try:
+                content = await file.read()
                 return content.decode('utf-8', errors='ignore')
             except:
                 return f"Unable to process file type: {file.content_type}"
                 
     except Exception as e:
-        logging.error(f"Error processing file {file.filename}: {e}")
+        logging.error("Error processing file %s: %s", file.filename, e)
         return f"Error processing file: {str(e)}"
 
+@lru_cache(maxsize=None)
+def _import_openai():
+    """Import the OpenAI SDK once and cache the client class"""
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:
+        raise Exception("OpenAI library not installed. Run: pip install openai")
+    return AsyncOpenAI
+
+@lru_cache(maxsize=None)
+def _import_gemini():
+    """Import the Google Generative AI SDK once and cache the module"""
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        raise Exception("Google Generative AI library not installed. Run: pip install google-generativeai")
+    return genai
+
+@lru_cache(maxsize=None)
+def _import_anthropic():
+    """Import the Anthropic SDK once and cache the module"""
+    try:
+        import anthropic
+    except ImportError:
+        raise Exception("Anthropic library not installed. Run: pip install anthropic")
+    return anthropic
+
+# Retry policy for provider rate limits (HTTP 429)
+LLM_MAX_RETRIES = 3
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 60.0
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an SDK exception signals a provider rate limit"""
+    # openai/anthropic expose status_code; google raises ResourceExhausted
+    return (getattr(error, "status_code", None) == 429
+            or type(error).__name__ in ("RateLimitError", "ResourceExhausted"))
+
+def _retry_on_rate_limit(func):
+    """Retry an async LLM call with jittered exponential backoff on 429s"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not _is_rate_limit_error(e):
+                    raise
+                delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)
+                logging.warning("LLM rate limited, retrying in %.1fs (attempt %s/%s)", delay, attempt + 1, LLM_MAX_RETRIES)
+                await asyncio.sleep(delay)
+    return wrapper
+
+class OpenAIWrapper:
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+    
+    @_retry_on_rate_limit
+    async def ainvoke(self, messages):
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=1000
+        )
+        return response.choices[0].message.content
+
+class GeminiWrapper:
+    def __init__(self, model):
+        self.model = model
+    
+    @_retry_on_rate_limit
+    async def ainvoke(self, messages):
+        # Convert messages to text prompt
+        prompt = "\n".join([f"{msg.get('role', 'user')}: {msg.get('content', '')}" for msg in messages])
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+class AnthropicWrapper:
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+    
+    @_retry_on_rate_limit
+    async def ainvoke(self, messages):
+        # Anthropic takes the system prompt out-of-band; marking it as a cache
+        # breakpoint lets repeated calls reuse the prefix instead of re-billing it
+        system = [
+            {"type": "text", "text": msg.get("content", ""), "cache_control": {"type": "ephemeral"}}
+            for msg in messages if msg.get("role") == "system"
+        ]
+        messages = [msg for msg in messages if msg.get("role") != "system"]
+        
+        kwargs = {"system": system} if system else {}
+        response = await self.client.messages.create(
+            model=self.model,
+            max_tokens=1000,
+            messages=messages,
+            **kwargs
+        )
+        return response.content[0].text
+
+def _build_openai(api_key: str, model: str) -> OpenAIWrapper:
+    AsyncOpenAI = _import_openai()
+    return OpenAIWrapper(AsyncOpenAI(api_key=api_key), model)
+
+def _build_gemini(api_key: str, model: str) -> GeminiWrapper:
+    genai = _import_gemini()
+    genai.configure(api_key=api_key)
+    return GeminiWrapper(genai.GenerativeModel(model))
+
+def _build_anthropic(api_key: str, model: str) -> AnthropicWrapper:
+    anthropic = _import_anthropic()
+    return AnthropicWrapper(anthropic.AsyncAnthropic(api_key=api_key), model)
+
+# Provider -> builder dispatch table; SDKs are imported on first use only
+_LLM_BUILDERS = {
+    "openai": _build_openai,
+    "gemini": _build_gemini,
+    "anthropic": _build_anthropic,
+}
+
+# Built LLM wrappers keyed by (provider, api_key, model) -> (instance, expiry),
+# least recently used first. Reusing an instance keeps its HTTP connection pool
+# warm between tasks; expired entries are purged and at most LLM_CACHE_SIZE kept
+# so API keys don't pile up in memory.
+# Gemini is excluded because genai.configure() sets the key process-wide.
+LLM_CACHE_TTL = 3600
+LLM_CACHE_SIZE = 8
+_LLM_CACHE: OrderedDict[Tuple[str, str, str], Tuple[Any, float]] = OrderedDict()
+_UNCACHED_PROVIDERS = frozenset({"gemini"})
+
 def get_llm_instance(provider: str, api_key: str, model: str):
     """Get LLM instance based on provider"""
     try:
-        if provider == "openai":
-            try:
-                from openai import AsyncOpenAI
-                client = AsyncOpenAI(api_key=api_key)
-                
-                class OpenAIWrapper:
-                    def __init__(self, client, model):
-                        self.client = client
-                        self.model = model
-                    
-                    async def ainvoke(self, messages):
-                        response = await self.client.chat.completions.create(
-                            model=self.model,
-                            messages=messages,
-                            max_tokens=1000
-                        )
-                        return response.choices[0].message.content
-                
-                return OpenAIWrapper(client, model)
-                
-            except ImportError:
-                raise Exception("OpenAI library not installed. Run: pip install openai")
+        builder = _LLM_BUILDERS.get(provider)
+        if builder is None:
+            raise Exception(f"Unsupported LLM provider: {provider}")
         
-        elif provider == "gemini":
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=api_key)
-                
-                class GeminiWrapper:
-                    def __init__(self, model_name):
-                        self.model = genai.GenerativeModel(model_name)
-                    
-                    async def ainvoke(self, messages):
-                        # Convert messages to text prompt
-                        prompt = "\n".join([f"{msg.get('role', 'user')}: {msg.get('content', '')}" for msg in messages])
-                        response = await self.model.generate_content_async(prompt)
-                        return response.text
-                
-                return GeminiWrapper(model)
-                
-            except ImportError:
-                raise Exception("Google Generative AI library not installed. Run: pip install google-generativeai")
+        if provider in _UNCACHED_PROVIDERS:
+            return builder(api_key, model)
         
-        elif provider == "anthropic":
-            try:
-                import anthropic
-                client = anthropic.AsyncAnthropic(api_key=api_key)
-                
-                class AnthropicWrapper:
-                    def __init__(self, client, model):
-                        self.client = client
-                        self.model = model
-                    
-                    async def ainvoke(self, messages):
-                        response = await self.client.messages.create(
-                            model=self.model,
-                            max_tokens=1000,
-                            messages=messages
-                        )
-                        return response.content[0].text
-                
-                return AnthropicWrapper(client, model)
-                
-            except ImportError:
-                raise Exception("Anthropic library not installed. Run: pip install anthropic")
+        key = (provider, api_key, model)
+        now = time.monotonic()
+        cached = _LLM_CACHE.get(key)
+        if cached is not None and cached[1] > now:
+            _LLM_CACHE.move_to_end(key)
+            return cached[0]
         
-        else:
-            raise Exception(f"Unsupported LLM provider: {provider}")
+        instance = builder(api_key, model)
+        for expired in [k for k, (_, expiry) in _LLM_CACHE.items() if expiry <= now]:
+            del _LLM_CACHE[expired]
+        _LLM_CACHE[key] = (instance, now + LLM_CACHE_TTL)
+        _LLM_CACHE.move_to_end(key)
+        while len(_LLM_CACHE) > LLM_CACHE_SIZE:
+            _LLM_CACHE.popitem(last=False)
+        return instance
             
     except Exception as e:
-        logging.error(f"Error creating LLM instance: {e}")
+        logging.error("Error creating LLM instance: %s", e)
         raise
 
-def parse_url_from_context(context: Dict[str, Any]) -> str:
-    """Extract URL from context"""
-    url = context.get("url", "")
-    if not url:
-        return "about:blank"
+# A leading "scheme:" that isn't a "host:port" pair (e.g. https:, file:, about:)
+_URL_SCHEME_RE = re.compile(r"[a-z][a-z0-9+.-]*:(?!\d)", re.IGNORECASE)
+
+def normalize_url(url: str) -> str:
+    """Add https:// to a scheme-less URL; anything else is returned as given"""
+    url = url.strip()
     
     # Add protocol if missing
-    if not url.startswith(("http://", "https://")):
+    if not _URL_SCHEME_RE.match(url):
         url = "https://" + url
     
     return url
 
+def canonical_url(url: str) -> str:
+    """Comparison form of an http(s) URL: lower-case scheme and host, "/" for an empty path
+    
+    The fragment is kept, since hash-routed pages use it to pick the view.
+    Only used to compare URLs - navigate to the normalize_url() form.
+    """
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ("http", "https"):
+        return url
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, parts.fragment))
+
+def parse_url_from_context(context: Dict[str, Any]) -> str:
+    """Extract URL from context"""
+    url = context.get("url", "")
+    if not url or url == "about:blank":
+        return "about:blank"
+    
+    return normalize_url(url)
+
+# Translation table replacing characters that are unsafe in filenames
+_UNSAFE_FILENAME_CHARS = str.maketrans({c: "_" for c in '<>:"/\\|?*'})
+
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe storage"""
-    # Remove or replace unsafe characters
-    safe_filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    # Replace unsafe characters in a single C-level pass (no regex engine)
+    safe_filename = filename.translate(_UNSAFE_FILENAME_CHARS)
     return safe_filename[:255]  # Limit length
 
 def format_duration(seconds: float) -> str:
@@ -1,9 +1,54 @@
+// Oldest log entries are dropped beyond this many to keep layout cheap
+const MAX_LOG_ENTRIES = 500;
+// How close (px) to the bottom the log must be for autoscroll to keep following
+const LOG_FOLLOW_THRESHOLD_PX = 24;
+
+// Models offered for each LLM provider
+const MODEL_OPTIONS = Object.freeze({
+    'openai': ['gpt-4', 'gpt-4o', 'gpt-3.5-turbo'],
+    'gemini': ['gemini-pro', 'gemini-pro-vision'],
+    'anthropic': ['claude-3-sonnet', 'claude-3-haiku']
+});
+
+// Display text for agent states and WebSocket connection states
+const STATUS_LABELS = Object.freeze({
+    'idle': 'Idle',
+    'running': 'Running',
+    'paused': 'Paused',
+    'stopping': 'Stopping',
+    'completed': 'Completed',
+    'error': 'Error'
+});
+const CONNECTION_LABELS = Object.freeze({
+    'connected': 'Connected',
+    'connecting': 'Connecting...',
+    'disconnected': 'Disconnected'
+});
+
+// Idle time (ms) after the last edit before the form is saved
+const SAVE_FORM_DELAY_MS = 300;
+
 class BrowserAgentApp {
     constructor() {
         this.ws = null;
         this.isConnected = false;
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
+        this.saveTimer = null;
+        this.actionIndicator = null;
+        this.followLog = true;
+        this.currentStatus = null;
+        
+        // Incoming messages are applied to the DOM in one batch per frame
+        this.pendingMessages = [];
+        this.drainScheduled = false;
+        this.draining = false;
+        // Log entries created while draining are inserted together
+        this.pendingLogEntries = document.createDocumentFragment();
+        
+        // Formatted clock time, reused for every log line in the same second
+        this.cachedTimeSecond = -1;
+        this.cachedTimeString = '';
         
         this.initializeElements();
         this.setupEventListeners();
@@ -34,6 +79,12 @@ class BrowserAgentApp {
         this.screenshotTimestamp = document.getElementById('screenshot-timestamp');
         this.logContainer = document.getElementById('log-container');
         this.connectionStatus = document.getElementById('connection-status');
+        this.connectionDot = this.connectionStatus.querySelector('.connection-dot');
+        this.connectionText = this.connectionStatus.querySelector('span:last-child');
+        
+        // Prototype log entry that new entries are cloned from
+        this.logEntryTemplate = document.createElement('div');
+        this.logEntryTemplate.innerHTML = '<span class="timestamp"></span><span class="message"></span>';
         
         // Modal elements
         this.errorModal = document.getElementById('error-modal');
@@ -60,10 +111,26 @@ class BrowserAgentApp {
             }
         });
         
-        // Auto-save form data
+        // Auto-save form data, debounced so typing doesn't hit localStorage per keystroke
         [this.llmProvider, this.model, this.apiKey, this.url, this.task].forEach(element => {
-            element.addEventListener('change', () => this.saveFormData());
-            element.addEventListener('input', () => this.saveFormData());
+            element.addEventListener('change', () => this.scheduleSaveFormData());
+            element.addEventListener('input', () => this.scheduleSaveFormData());
+        });
+        window.addEventListener('pagehide', () => {
+            if (this.saveTimer) {
+                this.saveFormData();
+            }
+        });
+        
+        // Log autoscroll follows new entries only while scrolled to the bottom
+        this.logContainer.addEventListener('scroll', () => {
+            const container = this.logContainer;
+            this.followLog = container.scrollHeight - container.scrollTop - container.clientHeight <= LOG_FOLLOW_THRESHOLD_PX;
+        }, { passive: true });
+        document.addEventListener('visibilitychange', () => {
+            if (!document.hidden && this.followLog) {
+                this.scrollLogToBottom();
+            }
         });
         
         // Load saved form data
@@ -72,22 +139,20 @@ class BrowserAgentApp {
 
     updateModelOptions() {
         const provider = this.llmProvider.value;
-        const models = {
-            'openai': ['gpt-4', 'gpt-4o', 'gpt-3.5-turbo'],
-            'gemini': ['gemini-pro', 'gemini-pro-vision'],
-            'anthropic': ['claude-3-sonnet', 'claude-3-haiku']
-        };
         
-        this.model.innerHTML = '';
-        models[provider].forEach(model => {
-            const option = document.createElement('option');
-            option.value = model;
-            option.textContent = model;
-            this.model.appendChild(option);
-        });
+        // Swap in the whole option list at once rather than one live insert per model
+        this.model.replaceChildren(...MODEL_OPTIONS[provider].map(model => new Option(model, model)));
+    }
+
+    scheduleSaveFormData() {
+        clearTimeout(this.saveTimer);
+        this.saveTimer = setTimeout(() => this.saveFormData(), SAVE_FORM_DELAY_MS);
     }
 
     saveFormData() {
+        clearTimeout(this.saveTimer);
+        this.saveTimer = null;
+        
         const formData = {
             llmProvider: this.llmProvider.value,
             model: this.model.value,
@@ -135,7 +200,7 @@ class BrowserAgentApp {
             this.ws.onmessage = (event) => {
                 try {
                     const data = JSON.parse(event.data);
-                    this.handleWebSocketMessage(data);
+                    this.queueMessage(data);
                 } catch (e) {
                     console.error('Failed to parse WebSocket message:', e);
                 }
@@ -175,6 +240,40 @@ class BrowserAgentApp {
         }
     }
 
+    queueMessage(data) {
+        this.pendingMessages.push(data);
+        if (!this.drainScheduled) {
+            this.drainScheduled = true;
+            // rAF doesn't fire in background tabs, so don't let messages pile up there
+            if (document.hidden) {
+                setTimeout(() => this.drainMessages(), 50);
+            } else {
+                requestAnimationFrame(() => this.drainMessages());
+            }
+        }
+    }
+
+    drainMessages() {
+        this.drainScheduled = false;
+        const messages = this.pendingMessages;
+        this.pendingMessages = [];
+        // Only the newest screenshot in a batch would ever be seen, so skip
+        // decoding the ones it replaces
+        const lastScreenshot = messages.findLastIndex(data => data.type === 'screenshot');
+        
+        this.draining = true;
+        try {
+            messages.forEach((data, index) => {
+                if (data.type !== 'screenshot' || index === lastScreenshot) {
+                    this.handleWebSocketMessage(data);
+                }
+            });
+        } finally {
+            this.draining = false;
+            this.flushLog();
+        }
+    }
+
     handleWebSocketMessage(data) {
         switch (data.type) {
             case 'connected':
@@ -214,27 +313,19 @@ class BrowserAgentApp {
     }
 
     updateConnectionStatus(status) {
-        const dot = this.connectionStatus.querySelector('.connection-dot');
-        const text = this.connectionStatus.querySelector('span:last-child');
-        
-        dot.className = `connection-dot ${status}`;
-        
-        switch (status) {
-            case 'connected':
-                text.textContent = 'Connected';
-                break;
-            case 'connecting':
-                text.textContent = 'Connecting...';
-                break;
-            case 'disconnected':
-                text.textContent = 'Disconnected';
-                break;
-        }
+        this.connectionDot.className = `connection-dot ${status}`;
+        this.connectionText.textContent = CONNECTION_LABELS[status];
     }
 
     updateStatus(status) {
+        // Repeated status messages would only redo the same class, button and overlay writes
+        if (status === this.currentStatus) {
+            return;
+        }
+        this.currentStatus = status;
+        
         this.statusDot.className = `status-dot ${status}`;
-        this.statusText.textContent = status.charAt(0).toUpperCase() + status.slice(1);
+        this.statusText.textContent = STATUS_LABELS[status] ?? status;
         
         // Update button states
         const isRunning = status === 'running';
@@ -256,27 +347,17 @@ class BrowserAgentApp {
     }
 
     updateCurrentAction(action) {
-        // Update the header or add visual indicator of current action
-        const actionIndicator = document.querySelector('.current-action') || 
-            this.createActionIndicator();
-        actionIndicator.textContent = action;
+        // Update the header or add visual indicator of current action;
+        // the element is created on first use and kept for later steps
+        if (!this.actionIndicator) {
+            this.actionIndicator = this.createActionIndicator();
+        }
+        this.actionIndicator.textContent = action;
     }
 
     createActionIndicator() {
         const indicator = document.createElement('div');
         indicator.className = 'current-action';
-        indicator.style.cssText = `
-            position: fixed;
-            top: 20px;
-            left: 50%;
-            transform: translateX(-50%);
-            background: #2563eb;
-            color: white;
-            padding: 8px 16px;
-            border-radius: 6px;
-            font-size: 0.9rem;
-            z-index: 100;
-        `;
         document.body.appendChild(indicator);
         return indicator;
     }
@@ -288,45 +369,88 @@ class BrowserAgentApp {
         if (description) {
             this.screenshotTimestamp.textContent = `- ${description}`;
         } else {
-            this.screenshotTimestamp.textContent = `- ${new Date().toLocaleTimeString()}`;
+            this.screenshotTimestamp.textContent = `- ${this.formatTime()}`;
         }
     }
 
-    addLogEntry(type, message) {
-        const entry = document.createElement('div');
+    formatTime() {
+        const second = Math.floor(Date.now() / 1000);
+        if (second !== this.cachedTimeSecond) {
+            this.cachedTimeSecond = second;
+            this.cachedTimeString = new Date(second * 1000).toLocaleTimeString();
+        }
+        return this.cachedTimeString;
+    }
+
+    createLogEntry(type, time, message) {
+        // One deep clone of the prototype instead of three createElement calls
+        const entry = this.logEntryTemplate.cloneNode(true);
         entry.className = `log-entry ${type}`;
+        entry.firstChild.textContent = time;
+        entry.lastChild.textContent = message;
+        return entry;
+    }
+
+    addLogEntry(type, message) {
+        this.pendingLogEntries.appendChild(this.createLogEntry(type, this.formatTime(), message));
+        if (!this.draining) {
+            this.flushLog();
+        }
+    }
+
+    flushLog() {
+        if (!this.pendingLogEntries.hasChildNodes()) {
+            return;
+        }
         
-        const timestamp = document.createElement('span');
-        timestamp.className = 'timestamp';
-        timestamp.textContent = new Date().toLocaleTimeString();
-        
-        const messageSpan = document.createElement('span');
-        messageSpan.className = 'message';
-        messageSpan.textContent = message;
+        // One insert and one scroll for the whole batch
+        this.logContainer.appendChild(this.pendingLogEntries);
         
-        entry.appendChild(timestamp);
-        entry.appendChild(messageSpan);
+        let excess = this.logContainer.childElementCount - MAX_LOG_ENTRIES;
+        while (excess-- > 0) {
+            this.logContainer.firstElementChild.remove();
+        }
         
-        this.logContainer.appendChild(entry);
+        // Leave the position alone if the user scrolled up to read, and skip
+        // the forced layout entirely while the tab is in the background
+        if (this.followLog && !document.hidden) {
+            this.scrollLogToBottom();
+        }
+    }
+
+    scrollLogToBottom() {
         this.logContainer.scrollTop = this.logContainer.scrollHeight;
     }
 
     clearLog() {
-        this.logContainer.innerHTML = '<div class="log-entry info"><span class="timestamp">Ready</span><span class="message">Log cleared</span></div>';
+        // Swap the whole log in one call instead of serializing through the HTML parser
+        this.logContainer.replaceChildren(this.createLogEntry('info', 'Ready', 'Log cleared'));
+    }
+
+    snapshotForm() {
+        // Read every field once; validation and the request share the snapshot
+        return {
+            task: this.task.value.trim(),
+            apiKey: this.apiKey.value.trim(),
+            llmProvider: this.llmProvider.value,
+            model: this.model.value,
+            url: this.url.value.trim()
+        };
     }
 
     async startAgent() {
-        if (!this.validateForm()) {
+        const form = this.snapshotForm();
+        if (!this.validateForm(form)) {
             return;
         }
         
         const taskData = {
-            task: this.task.value.trim(),
-            api_key: this.apiKey.value.trim(),
-            llm_provider: this.llmProvider.value,
-            model: this.model.value,
+            task: form.task,
+            api_key: form.apiKey,
+            llm_provider: form.llmProvider,
+            model: form.model,
             context: {
-                url: this.url.value.trim()
+                url: form.url
             },
             headless: false,
             max_steps: 50,
@@ -390,10 +514,8 @@ class BrowserAgentApp {
         }
     }
 
-    validateForm() {
-        const apiKey = this.apiKey.value.trim();
-        const task = this.task.value.trim();
-        const url = this.url.value.trim();
+    validateForm(form) {
+        const { apiKey, task, url } = form;
         
         if (!apiKey) {
             this.showError('Please enter your API key');